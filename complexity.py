@@ -1,227 +1,446 @@
-import ast
-import json
-
-# -------------------------------------------------------------------
-# 1. Extract a simplified representation of the loop iterable.
-#
-#    For time-complexity, a constant literal (or container) will be "c" meaning constant.
-# -------------------------------------------------------------------
-def extract_iterable(iter_node):
-    """
-    Simplify the loop's iterable according to these rules:
-    
-    1. If iter_node is a literal constant or container (string, list, tuple, set, dict):
-         -> return "c" (i.e. constant)
-         
-    2. If iter_node is a Call:
-         a. If the call is to range(...):
-              - If all arguments are constant, return "c"
-              - Else, for the first nonconstant argument:
-                    * If it is a Name, return "len(<name>)"
-                    * If it is a call to len(...) with a Name argument, return "len(<name>)"
-                    * Otherwise, return "len(other)"
-         b. If the call is to len(...):
-              - If its sole argument is a Name, return "len(<name>)"
-              - Else, return "len(other)"
-         c. For any other function call, return "len(other)"
-    
-    3. If iter_node is a Name:
-         -> return "len(<name>)"
-    
-    4. Otherwise, return "len(other)"
-    """
-    # Case 1: Literals or containers are constant
-    if isinstance(iter_node, (ast.Constant, ast.List, ast.Tuple, ast.Set, ast.Dict)):
-        return "c"
-    
-    # Case 2: Function calls
-    if isinstance(iter_node, ast.Call):
-        if isinstance(iter_node.func, ast.Name):
-            fname = iter_node.func.id
-            if fname == "range":
-                # If all range arguments are constant:
-                if all(isinstance(arg, ast.Constant) for arg in iter_node.args):
-                    return "c"
-                else:
-                    # Look for the first nonconstant argument.
-                    for arg in iter_node.args:
-                        if not isinstance(arg, ast.Constant):
-                            if isinstance(arg, ast.Name):
-                                return f"len({arg.id})"
-                            # Check if the argument is a call to len(...) with a Name argument.
-                            elif (isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and 
-                                  arg.func.id == "len" and arg.args and isinstance(arg.args[0], ast.Name)):
-                                return f"len({arg.args[0].id})"
-                            else:
-                                return "len(other)"
-                    return "len(other)"
-            elif fname == "len":
-                if iter_node.args and isinstance(iter_node.args[0], ast.Name):
-                    return f"len({iter_node.args[0].id})"
-                else:
-                    return "len(other)"
-            else:
-                return "len(other)"
-        else:
-            return "len(other)"
-    
-    # Case 3: A variable reference
-    if isinstance(iter_node, ast.Name):
-         return f"len({iter_node.id})"
-    
-    # Case 4: Fallback
-    return "len(other)"
-
-
-# -------------------------------------------------------------------
-# 2. Build a hierarchical loop tree.
-# -------------------------------------------------------------------
-class LoopNode:
-    """
-    A node in the loop tree.
-    
-    Attributes:
-      - node: The original AST node (For or While) or a string ("Global Root")
-      - loop_type: "For", "While", or None (if global/root)
-      - iterable: The simplified iteration factor (only for For loops)
-      - children: List of nested LoopNode objects.
-    """
-    def __init__(self, node, loop_type=None, iterable=None):
-        self.node = node
-        self.loop_type = loop_type    # "For", "While", or None for root
-        self.iterable = iterable      # Only applicable for For loops
-        self.children = []
-
-def loop_to_dict(loop_node):
-    """Convert the LoopNode tree recursively to a dict for JSON output."""
-    if loop_node.loop_type is None:
-        d = {"node": "Global Root", "children": []}
-    else:
-        d = {
-            "node": loop_node.loop_type,
-            "iterable": loop_node.iterable,
-            "children": []
-        }
-    d["children"] = [loop_to_dict(child) for child in loop_node.children]
-    return d
-
-class LoopTreeVisitor(ast.NodeVisitor):
-    """
-    An AST visitor that builds a hierarchical tree of loops.
-    
-    Sibling loops in the same block become siblings in the tree;
-    loops nested inside another loop become children.
-    """
-    def __init__(self):
-        self.root = LoopNode("Global Root")
-        self.loop_stack = [self.root]
-
-    def visit_For(self, node):
-        iterable = extract_iterable(node.iter)
-        new_loop = LoopNode(node, loop_type="For", iterable=iterable)
-        self.loop_stack[-1].children.append(new_loop)
-        self.loop_stack.append(new_loop)
-        for stmt in node.body:
-            self.visit(stmt)
-        for stmt in node.orelse:
-            self.visit(stmt)
-        self.loop_stack.pop()
-
-    def visit_While(self, node):
-        new_loop = LoopNode(node, loop_type="While", iterable=None)
-        self.loop_stack[-1].children.append(new_loop)
-        self.loop_stack.append(new_loop)
-        for stmt in node.body:
-            self.visit(stmt)
-        for stmt in node.orelse:
-            self.visit(stmt)
-        self.loop_stack.pop()
-    
-    def generic_visit(self, node):
-        super().generic_visit(node)
-
-
-# -------------------------------------------------------------------
-# 3. Compute the symbolic time complexity from the loop tree.
-#
-#    This version simplifies away redundant multiplications or additions with "1".
-# -------------------------------------------------------------------
-def compute_complexity(node):
-    """
-    Recursively compute a symbolic time complexity expression.
-    Simplify away redundant multiplications or additions with "1".
-    
-    - For the global root, we sum the complexities of its children.
-    - For a For loop:
-         Let factor be its iteration factor (if "c", treat as "1").
-         If there are nested loops, multiply the outer factor by the sum
-         of the inner complexities; if there are none, assume cost "1".
-         Then, if one part is "1", return just the other.
-    - For a While loop, we denote its cost as unknown ("?").
-    """
-    if node.loop_type is None:
-        # Global root: sum costs of children and drop redundant "1" if others exist.
-        costs = [compute_complexity(child) for child in node.children]
-        non_ones = [c for c in costs if c != "1"]
-        if non_ones:
-            return " + ".join(non_ones)
-        else:
-            return "1"
-
-    if node.loop_type == "For":
-        factor = node.iterable
-        factor_expr = "1" if factor == "c" else factor
-        inner = " + ".join(compute_complexity(child) for child in node.children) if node.children else "1"
-        
-        # Simplify away multiplication by 1.
-        if inner == "1":
-            return factor_expr
-        if factor_expr == "1":
-            return inner
-        return f"{factor_expr}*({inner})"
-
-    if node.loop_type == "While":
-        inner = " + ".join(compute_complexity(child) for child in node.children) if node.children else "1"
-        return "?" if inner == "1" else f"?*({inner})"
-
-    return "1"  # Fallback
-
-
-# -------------------------------------------------------------------
-# 4. Put it all together and simulate with sample code.
-# -------------------------------------------------------------------
-code = """
-for i in range(1,n):
-    for j in ['a', 'b', 'c']:
-        print(i, j)
-for i in num:
-    print(1)
-"""
-
-# Parse the code into an AST.
-tree = ast.parse(code)
-visitor = LoopTreeVisitor()
-visitor.visit(tree)
-
-def print_loop_tree(node, indent=0):
-    spacing = " " * indent
-    if node.loop_type is None:
-        print(spacing + "Global Root")
-    elif node.loop_type == "For":
-        print(spacing + f"For (iterable: {node.iterable})")
-    elif node.loop_type == "While":
-        print(spacing + "While")
-    for child in node.children:
-        print_loop_tree(child, indent + 4)
-
-print("Tree structure:")
-print_loop_tree(visitor.root)
-
-tree_json = json.dumps(loop_to_dict(visitor.root), indent=4)
-print("\nJSON representation:")
-print(tree_json)
-
-# Compute and print the time complexity expression.
-time_complexity = compute_complexity(visitor.root)
-print("\nEstimated Time Complexity Expression:")
-print(time_complexity)
\ No newline at end of file
+import ast
+import sys
+from bisect import bisect_left
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Optional, TextIO, Union, cast
+
+try:
+    from mypy_extensions import mypyc_attr
+except ImportError:  # only needed when compiling with mypyc (see setup.py)
+    def mypyc_attr(*attrs, **kwattrs):  # type: ignore[misc]
+        return lambda cls: cls
+
+# AST classes bound once at module level, so hot paths do a single global
+# lookup rather than ast.<attr> each time.
+_Constant, _List, _Tuple, _Set, _Dict, _Name, _Call, _For, _While = (
+    ast.Constant, ast.List, ast.Tuple, ast.Set, ast.Dict, ast.Name, ast.Call, ast.For, ast.While)
+
+# Shared result strings, so repeated results are the same object and can be
+# compared by identity.
+_C = sys.intern("c")
+_ONE = sys.intern("1")
+_UNKNOWN = sys.intern("?")
+_LEN_OTHER = sys.intern("len(other)")
+_LEN_CACHE: dict[str, str] = {}
+
+def _len_name(name: str) -> str:
+    """Return the shared "len(<name>)" string for a variable name."""
+    s = _LEN_CACHE.get(name)
+    if s is None:
+        s = sys.intern(f"len({name})")
+        _LEN_CACHE[name] = s
+    return s
+
+# Complexity expressions are carried as polynomials: a dict mapping each
+# product term, a sorted tuple of atoms such as ("len(m)", "len(n)"), to
+# its coefficient. The constant term is the empty tuple. Polynomials may be
+# shared between nodes, so they are never modified once built.
+Poly = dict[tuple[str, ...], int]
+_POLY_ONE: Poly = {(): 1}
+
+# "?" and "len(other)" stand for quantities the analyzer cannot name, so two
+# occurrences are not known to be equal. Each loop's copy is tagged with a
+# per-loop serial ("?#3") to keep it out of like-term and power merging, and
+# the tag is dropped when rendering.
+_OPAQUE_ATOMS = frozenset({_UNKNOWN, _LEN_OTHER})
+_OPAQUE_TAG = "#"
+
+# -------------------------------------------------------------------
+# 1. Extract a simplified representation of the loop iterable.
+#
+#    For time-complexity, a constant literal (or container) will be "c" meaning constant.
+# -------------------------------------------------------------------
+def extract_iterable(iter_node: ast.AST) -> str:
+    """
+    Simplify the loop's iterable according to these rules:
+    
+    1. If iter_node is a literal constant or container (string, list, tuple, set, dict):
+         -> return "c" (i.e. constant)
+         
+    2. If iter_node is a Call:
+         a. If the call is to range(...):
+              - If all arguments are constant, return "c"
+              - Else, for the first nonconstant argument:
+                    * If it is a Name, return "len(<name>)"
+                    * If it is a call to len(...) with a Name argument, return "len(<name>)"
+                    * Otherwise, return "len(other)"
+         b. If the call is to len(...):
+              - If its sole argument is a Name, return "len(<name>)"
+              - Else, return "len(other)"
+         c. For any other function call, return "len(other)"
+    
+    3. If iter_node is a Name:
+         -> return "len(<name>)"
+    
+    4. Otherwise, return "len(other)"
+    """
+    return _HANDLERS.get(type(iter_node), _other)(iter_node)
+
+# Callee names compared with == rather than is: ASTs that were unpickled or
+# built by hand need not hold interned strings, and == already short-cuts
+# when both sides are the same object.
+_RANGE = "range"
+_LEN = "len"
+
+def _const(iter_node: ast.AST) -> str:
+    # Case 1: Literals or containers are constant
+    return _C
+
+def _name(iter_node: ast.Name) -> str:
+    # Case 3: A variable reference
+    return _len_name(iter_node.id)
+
+def _other(iter_node: ast.AST) -> str:
+    # Case 4: Fallback
+    return _LEN_OTHER
+
+def _call(iter_node: ast.Call) -> str:
+    # Case 2: Function calls
+    func = iter_node.func
+    if type(func) is not _Name:
+        return _LEN_OTHER
+    fname = func.id
+    args = iter_node.args
+    if fname == _RANGE:
+        # Find the first nonconstant argument in a single scan; if there is
+        # none, every range argument is constant.
+        first_nonconst = None
+        for arg in args:
+            if type(arg) is not _Constant:
+                first_nonconst = arg
+                break
+        if first_nonconst is None:
+            return _C
+        return _RANGE_ARG_HANDLERS.get(type(first_nonconst), _other)(first_nonconst)
+    if fname == _LEN:
+        if args and type(args[0]) is _Name:
+            return _len_name(args[0].id)
+        return _LEN_OTHER
+    return _LEN_OTHER
+
+def _range_arg_call(arg: ast.Call) -> str:
+    # A range() bound given as len(<name>)
+    func = arg.func
+    args = arg.args
+    if type(func) is _Name and func.id == _LEN and args and type(args[0]) is _Name:
+        return _len_name(args[0].id)
+    return _LEN_OTHER
+
+# AST node classes are never subclassed, so exact type checks (identity or
+# set membership) stand in for isinstance throughout.
+_CONST_CONTAINERS = frozenset({_Constant, _List, _Tuple, _Set, _Dict})
+
+_HANDLERS: dict[type, Callable[[Any], str]] = dict.fromkeys(_CONST_CONTAINERS, _const)
+_HANDLERS[_Name] = _name
+_HANDLERS[_Call] = _call
+
+# Classifies the first nonconstant range() argument; anything else is "len(other)".
+_RANGE_ARG_HANDLERS: dict[type, Callable[[Any], str]] = {
+    _Name: _name,
+    _Call: _range_arg_call,
+}
+
+
+# -------------------------------------------------------------------
+# 2. Build a hierarchical loop tree.
+# -------------------------------------------------------------------
+@mypyc_attr(allow_interpreted_subclasses=False)
+class LoopNode:
+    """
+    A node in the loop tree.
+    
+    Attributes:
+      - node: The original AST node (For or While) or a string ("Global Root")
+      - loop_type: "For", "While", or None (if global/root)
+      - iterable: The simplified iteration factor (only for For loops)
+      - children: List of nested LoopNode objects.
+    """
+    __slots__ = ("node", "loop_type", "iterable", "children")
+
+    node: Union[ast.AST, str]
+    loop_type: Optional[str]
+    iterable: Optional[str]
+    children: list["LoopNode"]
+
+    def __init__(self, node: Union[ast.AST, str], loop_type: Optional[str] = None,
+                 iterable: Optional[str] = None) -> None:
+        self.node = node
+        self.loop_type = loop_type    # "For", "While", or None for root
+        self.iterable = iterable      # Only applicable for For loops
+        self.children = []
+
+def loop_to_json(loop_node: LoopNode, fp: TextIO, indent: Union[int, str, None] = None) -> None:
+    """
+    Write the LoopNode tree as JSON to the file-like object fp.
+    
+    The output matches json.dump() of the equivalent nested dict
+    ({"node": ..., "iterable": ..., "children": [...]}), including its
+    layout for an int or str indent, but is written straight from the tree
+    without building the intermediate dicts.
+    """
+    write = fp.write
+    encode = encode_basestring_ascii
+    if indent is None:
+        sep, pad, unit = ", ", "", ""
+    else:
+        # Like json, an int indent means that many spaces per level.
+        sep, pad = ",", "\n"
+        unit = indent if isinstance(indent, str) else " " * indent
+    # Entries are either literal text or (node, depth) still to be expanded;
+    # children are pushed reversed so they pop in order.
+    stack: list[Any] = [(loop_node, 0)]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            write(item)
+            continue
+        node, depth = item
+        if indent is None:
+            outer = inner = nested = ""
+        else:
+            outer = pad + unit * depth
+            inner = pad + unit * (depth + 1)
+            nested = pad + unit * (depth + 2)
+        if node.loop_type is None:
+            write('{' + inner + '"node": "Global Root"')
+        else:
+            iterable = "null" if node.iterable is None else encode(node.iterable)
+            write('{' + inner + '"node": ' + encode(node.loop_type) +
+                  sep + inner + '"iterable": ' + iterable)
+        write(sep + inner + '"children": [')
+        children = node.children
+        if not children:
+            write("]" + outer + "}")
+            continue
+        stack.append(inner + "]" + outer + "}")
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], depth + 2))
+            stack.append(nested if i == 0 else sep + nested)
+
+# Statements that can hold nested loops without being loops themselves,
+# mapped to the fields holding their sub-blocks.  Expression subtrees are
+# never entered since only statements can contain a For/While.
+_BLOCK_FIELDS = {
+    ast.If: ("body", "orelse"),
+    ast.With: ("body",),
+    ast.AsyncWith: ("body",),
+    ast.AsyncFor: ("body", "orelse"),
+    ast.Try: ("body", "handlers", "orelse", "finalbody"),
+    ast.ExceptHandler: ("body",),
+    ast.FunctionDef: ("body",),
+    ast.AsyncFunctionDef: ("body",),
+    ast.ClassDef: ("body",),
+}
+if hasattr(ast, "Match"):
+    _BLOCK_FIELDS[ast.Match] = ("cases",)
+    _BLOCK_FIELDS[ast.match_case] = ("body",)
+if hasattr(ast, "TryStar"):
+    _BLOCK_FIELDS[ast.TryStar] = _BLOCK_FIELDS[ast.Try]
+
+class LoopTreeVisitor:
+    """
+    Builds a hierarchical tree of loops in a single walk over the statements.
+    
+    Sibling loops in the same block become siblings in the tree;
+    loops nested inside another loop become children.
+    """
+    def build(self, module: ast.Module) -> LoopNode:
+        """Return the "Global Root" LoopNode for a parsed module."""
+        root = LoopNode("Global Root")
+        self._walk(module.body, root)
+        return root
+
+    def _walk(self, stmts: list[Any], parent: LoopNode) -> None:
+        # The enclosing loop travels as an argument, so no stack of open
+        # loops is kept. Recursion depth is bounded by block nesting, which
+        # the Python parser already caps.
+        for stmt in stmts:
+            kind = type(stmt)
+            if kind is _For:
+                new_loop = LoopNode(stmt, loop_type="For", iterable=extract_iterable(stmt.iter))
+            elif kind is _While:
+                new_loop = LoopNode(stmt, loop_type="While", iterable=None)
+            else:
+                fields = _BLOCK_FIELDS.get(kind)
+                if fields is not None:
+                    for field in fields:
+                        self._walk(getattr(stmt, field), parent)
+                continue
+            parent.children.append(new_loop)
+            self._walk(stmt.body, new_loop)
+            self._walk(stmt.orelse, new_loop)
+
+
+# -------------------------------------------------------------------
+# 3. Compute the symbolic time complexity from the loop tree.
+#
+#    Costs are built bottom-up as canonical polynomials, so like terms
+#    from anywhere in the tree combine.
+# -------------------------------------------------------------------
+def compute_complexity(node: LoopNode) -> str:
+    """
+    Compute a symbolic time complexity expression.
+    Simplify away redundant multiplications or additions with "1".
+    
+    - For the global root, we sum the complexities of its children.
+    - For a For loop:
+         Let factor be its iteration factor (if "c", treat as "1").
+         If there are nested loops, multiply the outer factor by the sum
+         of the inner complexities; if there are none, assume cost "1".
+    - For a While loop, we denote its cost as unknown ("?").
+    
+    Costs are expanded into a sum of products and like terms are combined,
+    so three nested loops over n, m and k give "len(k)*len(m)*len(n)" and
+    two sibling loops over n give "2*len(n)". Atoms within a term are
+    sorted, and repeated atoms are written as powers. "?" and "len(other)"
+    never combine across loops, since they need not be the same quantity.
+    Constant terms are dropped from every sum that also has a loop cost
+    in it.
+    
+    The tree is evaluated in post-order with an explicit stack, so deep
+    nests do not hit the recursion limit. Each node's polynomial is kept
+    by id only for the duration of this call, and only the root's result
+    is rendered.
+    """
+    results: dict[int, Poly] = {}
+    stack = [(node, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if not expanded:
+            # Revisit once every child has a result.
+            stack.append((current, True))
+            stack.extend((child, False) for child in current.children)
+            continue
+        children = [results[id(child)] for child in current.children]
+        results[id(current)] = _build_poly(current, children, len(results))
+    return _render(results[id(node)])
+
+def _build_poly(node: LoopNode, children: list[Poly], serial: int) -> Poly:
+    """
+    Build the polynomial for one node from its children's polynomials;
+    serial is unique to the node within one compute_complexity call.
+    """
+    inner = _sum_children(children)
+    if node.loop_type is None:
+        # Global root: just the sum of its children.
+        return inner
+
+    if node.loop_type == "For":
+        factor = node.iterable
+        if factor is None or factor == _C:
+            return inner
+        if factor in _OPAQUE_ATOMS:
+            factor = f"{factor}{_OPAQUE_TAG}{serial}"
+        return _times(factor, inner)
+
+    if node.loop_type == "While":
+        return _times(f"{_UNKNOWN}{_OPAQUE_TAG}{serial}", inner)
+
+    return _POLY_ONE  # Fallback
+
+def _sum_children(children: list[Poly]) -> Poly:
+    """
+    Add the children's polynomials in one pass, combining like terms and
+    dropping constant terms since they are dominated by any loop cost; a
+    sum of constants alone costs 1.
+    """
+    total: Poly = {}
+    for child in children:
+        for term, coeff in child.items():
+            if term:
+                total[term] = total.get(term, 0) + coeff
+    return total if total else _POLY_ONE
+
+def _times(atom: str, poly: Poly) -> Poly:
+    """Multiply every term of poly by atom, keeping each term sorted."""
+    result: Poly = {}
+    for term, coeff in poly.items():
+        i = bisect_left(term, atom)
+        result[term[:i] + (atom,) + term[i:]] = coeff
+    return result
+
+def _render(poly: Poly) -> str:
+    """
+    Render a polynomial, writing repeated atoms as powers and dropping the
+    per-loop tags of opaque atoms.
+    """
+    out: list[str] = []
+    for term, coeff in poly.items():
+        if out:
+            out.append(" + ")
+        if not term:
+            out.append(_ONE if coeff == 1 else str(coeff))
+            continue
+        if coeff != 1:
+            out.append(f"{coeff}*")
+        i = 0
+        while i < len(term):
+            atom = term[i]
+            j = i + 1
+            while j < len(term) and term[j] == atom:
+                j += 1
+            if i:
+                out.append("*")
+            if _OPAQUE_TAG in atom:
+                atom = atom.partition(_OPAQUE_TAG)[0]
+            out.append(atom if j - i == 1 else f"{atom}**{j - i}")
+            i = j
+    return "".join(out)
+
+
+# -------------------------------------------------------------------
+# 4. Analyze a piece of source code.
+# -------------------------------------------------------------------
+@lru_cache(maxsize=512)
+def analyze(source: str) -> str:
+    """
+    Return the estimated time complexity expression for Python source code.
+    
+    Results are cached per source string, so repeated snippets are not
+    parsed again.
+    """
+    # Same as ast.parse(source), minus its Python-level wrapper.
+    tree = cast(ast.Module, compile(source, "<analyze>", "exec", flags=ast.PyCF_ONLY_AST))
+    return compute_complexity(LoopTreeVisitor().build(tree))
+
+
+def print_loop_tree(node, indent=0):
+    spacing = " " * indent
+    if node.loop_type is None:
+        print(spacing + "Global Root")
+    elif node.loop_type == "For":
+        print(spacing + f"For (iterable: {node.iterable})")
+    elif node.loop_type == "While":
+        print(spacing + "While")
+    for child in node.children:
+        print_loop_tree(child, indent + 4)
+
+
+# -------------------------------------------------------------------
+# 5. Put it all together and simulate with sample code.
+# -------------------------------------------------------------------
+if __name__ == "__main__":
+    code = """
+for i in range(1,n):
+    for j in ['a', 'b', 'c']:
+        print(i, j)
+for i in num:
+    print(1)
+"""
+
+    # Parse the code into an AST.
+    tree = ast.parse(code)
+    loop_tree = LoopTreeVisitor().build(tree)
+
+    print("Tree structure:")
+    print_loop_tree(loop_tree)
+
+    print("\nJSON representation:")
+    loop_to_json(loop_tree, sys.stdout, indent=4)
+    print()
+
+    # Compute and print the time complexity expression.
+    time_complexity = compute_complexity(loop_tree)
+    print("\nEstimated Time Complexity Expression:")
+    print(time_complexity)
@@ -0,0 +1,23 @@
+"""
+Optional native build of the analyzer.
+
+complexity.py runs as plain Python. When mypy is installed, this compiles it
+to a C extension with mypyc for batch analysis:
+
+    pip install mypy
+    python setup.py build_ext --inplace
+"""
+from setuptools import setup
+
+try:
+    from mypyc.build import mypycify
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = mypycify(["complexity.py"])
+
+setup(
+    name="time-complexity-analyzer",
+    py_modules=["complexity"],
+    ext_modules=ext_modules,
+)
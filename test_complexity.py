@@ -0,0 +1,134 @@
+import ast
+import io
+import json
+import sysconfig
+import unittest
+from pathlib import Path
+
+from complexity import LoopTreeVisitor, analyze, compute_complexity, loop_to_json
+
+
+def complexity_of(source):
+    return compute_complexity(LoopTreeVisitor().build(ast.parse(source)))
+
+
+class RenderingTest(unittest.TestCase):
+    def test_sibling_loops_combine_like_terms(self):
+        source = (
+            "for i in n:\n"
+            "    pass\n"
+            "for j in n:\n"
+            "    pass\n"
+        )
+        self.assertEqual(complexity_of(source), "2*len(n)")
+
+    def test_nested_sum_is_expanded(self):
+        source = (
+            "for i in n:\n"
+            "    for j in n:\n"
+            "        pass\n"
+            "    for k in m:\n"
+            "        pass\n"
+        )
+        self.assertEqual(complexity_of(source), "len(n)**2 + len(m)*len(n)")
+
+    def test_unrelated_while_loops_stay_separate(self):
+        source = (
+            "while a:\n"
+            "    pass\n"
+            "while b:\n"
+            "    pass\n"
+        )
+        self.assertEqual(complexity_of(source), "? + ?")
+
+    def test_opaque_factors_do_not_become_powers(self):
+        source = (
+            "for i in range(self.m):\n"
+            "    for j in range(self.n):\n"
+            "        pass\n"
+        )
+        self.assertEqual(complexity_of(source), "len(other)*len(other)")
+
+    def test_constant_sibling_is_dropped(self):
+        source = (
+            "for i in n:\n"
+            "    for j in m:\n"
+            "        pass\n"
+            "    for k in range(3):\n"
+            "        pass\n"
+        )
+        self.assertEqual(complexity_of(source), "len(m)*len(n)")
+
+    def test_empty_module_costs_one(self):
+        self.assertEqual(complexity_of(""), "1")
+        self.assertEqual(analyze(""), "1")
+
+
+def loop_to_dict(node):
+    """Reference dict form of a loop tree, as json.dumps would see it."""
+    if node.loop_type is None:
+        d = {"node": "Global Root"}
+    else:
+        d = {"node": node.loop_type, "iterable": node.iterable}
+    d["children"] = [loop_to_dict(child) for child in node.children]
+    return d
+
+
+JSON_SAMPLES = [
+    "",
+    "x = 1\n",
+    (
+        "for i in range(1, n):\n"
+        "    for j in ['a', 'b', 'c']:\n"
+        "        print(i, j)\n"
+        "for i in num:\n"
+        "    print(1)\n"
+    ),
+    (
+        "def f(a, b):\n"
+        "    for x in a:\n"
+        "        if x:\n"
+        "            for y in b:\n"
+        "                pass\n"
+        "        while x:\n"
+        "            for z in 'é':\n"
+        "                pass\n"
+    ),
+    (
+        "for i in x:\n"
+        "    pass\n"
+        "else:\n"
+        "    for j in f(y):\n"
+        "        pass\n"
+    ),
+]
+
+
+class LoopToJsonTest(unittest.TestCase):
+    def assertMatchesJsonDumps(self, module, indent):
+        tree = LoopTreeVisitor().build(module)
+        out = io.StringIO()
+        loop_to_json(tree, out, indent=indent)
+        self.assertEqual(out.getvalue(), json.dumps(loop_to_dict(tree), indent=indent))
+
+    def test_matches_json_dumps(self):
+        for source in JSON_SAMPLES:
+            module = ast.parse(source)
+            for indent in (None, 0, 2, 4, "", "\t"):
+                with self.subTest(source=source, indent=indent):
+                    self.assertMatchesJsonDumps(module, indent)
+
+    def test_matches_json_dumps_on_stdlib(self):
+        stdlib = Path(sysconfig.get_paths()["stdlib"])
+        for path in sorted(stdlib.rglob("*.py")):
+            if "site-packages" in path.parts:
+                continue
+            try:
+                module = ast.parse(path.read_text(encoding="utf-8"))
+            except (SyntaxError, UnicodeDecodeError, ValueError, OSError):
+                continue
+            with self.subTest(path=str(path)):
+                self.assertMatchesJsonDumps(module, 2)
+
+if __name__ == "__main__":
+    unittest.main()